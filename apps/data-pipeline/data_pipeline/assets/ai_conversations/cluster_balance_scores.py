@@ -42,7 +42,8 @@ async def cluster_balance_scores(
                     for k, v in zip(
                         ["balance_score", "balance_scores_detailed"],
                         calculate_balance_scores(
-                            x["user1_embeddings"], x["user2_embeddings"]
+                            np.asarray(x["user1_embeddings"], dtype=np.float32),
+                            np.asarray(x["user2_embeddings"], dtype=np.float32),
                         ),
                     )
                 },
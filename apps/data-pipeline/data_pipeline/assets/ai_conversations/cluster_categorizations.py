@@ -7,8 +7,10 @@ from dagster import (
     AssetIn,
     asset,
 )
-from json_repair import repair_json
 
+from data_pipeline.assets.ai_conversations.utils.parse_llm_json import (
+    parse_llm_json,
+)
 from data_pipeline.constants.custom_config import RowLimitConfig
 from data_pipeline.partitions import user_partitions_def
 from data_pipeline.resources.batch_inference.base_llm_resource import (
@@ -75,7 +77,7 @@ Here are the conversations:
 def parse_cluster_categorization(completion: str) -> dict:
     """Parse the LLM's cluster categorization response and return the category."""
     try:
-        res = repair_json(completion, return_objects=True)
+        res = parse_llm_json(completion)
 
         if (
             isinstance(res, dict)
@@ -156,12 +158,7 @@ async def cluster_categorizations(
             sampled_df = cluster_df
 
         # Prepare sample conversations for categorization
-        sample_conversations = []
-
-        for row in sampled_df.select("title", "summary").iter_rows(named=True):
-            sample_conversations.append(
-                {"title": row["title"], "summary": row["summary"]}
-            )
+        sample_conversations = sampled_df.select("title", "summary").to_dicts()
 
         # Only prepare prompt if we have sample conversations
         if sample_conversations:
@@ -215,13 +212,14 @@ async def cluster_categorizations(
     if cluster_results:
         result_df = conversation_pair_clusters.with_columns(
             [
-                pl.when(pl.col("cluster_id").is_in(list(cluster_results.keys())))
-                .then(
-                    pl.col("cluster_id").map_elements(
-                        lambda x: cluster_results[x]["category"]
-                    )
+                # Map the categories in one columnar pass, no per-row callback
+                pl.col("cluster_id")
+                .replace_strict(
+                    list(cluster_results.keys()),
+                    [result["category"] for result in cluster_results.values()],
+                    default="practical",
+                    return_dtype=pl.Utf8,
                 )
-                .otherwise(pl.lit("practical"))
                 .alias("category"),
             ]
         )
@@ -1,4 +1,5 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal
 
 import numpy as np
@@ -15,6 +16,7 @@ from data_pipeline.assets.ai_conversations.utils.data_loading import (
     get_materialized_partitions,
 )
 from data_pipeline.assets.ai_conversations.utils.find_top_k_users import (
+    embeddings_to_array,
     find_top_k_users,
     load_user_embeddings,
 )
@@ -51,18 +53,19 @@ def create_empty_result():
 
 def get_conversation_data(df, row_idx):
     """Extract conversation data from DataFrame at the given row index."""
-    return (
-        df.filter(pl.col("row_idx") == row_idx)
-        .select(
-            "row_idx",
+    # The cluster labels are positional, so read the row directly instead of
+    # filtering the whole frame for it
+    row_idx = int(row_idx)
+    return {
+        "row_idx": row_idx,
+        **df.select(
             "conversation_id",
             "title",
             "summary",
             "start_date",
             "start_time",
-        )
-        .row(0, named=True)
-    )
+        ).row(row_idx, named=True),
+    }
 
 
 def collect_user_data(user_ids, logger):
@@ -162,16 +165,15 @@ def conversation_pair_clusters(
         )
 
     # Current user data
-    current_user_df = conversations_embeddings.with_row_count("row_idx")
-    emb1_list = current_user_df["embedding"].to_list()
+    current_user_df = conversations_embeddings
 
-    if not emb1_list:
+    if current_user_df.is_empty():
         logger.info("No embeddings for current user, nothing to cluster.")
         return create_empty_result(), pl.DataFrame(
             schema={"user_id": pl.Utf8, "similarity": pl.Float32}
         )
 
-    emb1_array = np.array(emb1_list, dtype=np.float32)
+    emb1_array = embeddings_to_array(current_user_df)
 
     t0 = time.time()
 
@@ -199,12 +201,18 @@ def conversation_pair_clusters(
         logger.info("No similar users found.")
         return create_empty_result(), user_similarities_df
 
-    # Load embeddings only for the top K users
+    # Load embeddings only for the top K users, reading their Parquet files
+    # concurrently
+    top_user_ids = [user_id for user_id, _ in top_users]
     user_data = {}
-    for user_id, _ in top_users:
-        df, embeddings = load_user_embeddings(user_id)
-        if df is not None and embeddings is not None:
-            user_data[user_id] = (df, embeddings)
+    with ThreadPoolExecutor(max_workers=min(32, len(top_user_ids))) as executor:
+        for user_id, (df, embeddings) in zip(
+            top_user_ids,
+            executor.map(load_user_embeddings, top_user_ids),
+            strict=True,
+        ):
+            if df is not None and embeddings is not None:
+                user_data[user_id] = (df, embeddings)
 
     all_pairs = []
     global_cluster_id_offset = 0
@@ -272,16 +280,15 @@ def conversation_pair_clusters(
             ).with_columns(pl.lit(current_user_id).alias("user_id"))
         )
 
-        # Then load embeddings for other users in the result
+        # Then reuse the already loaded embeddings for other users in the result
         for uid in unique_user_ids:
             if uid != current_user_id:
-                user_df, _ = load_user_embeddings(uid)
-                if user_df is not None:
-                    all_embeddings.append(
-                        user_df.select("conversation_id", "embedding").with_columns(
-                            pl.lit(uid).alias("user_id")
-                        )
+                user_df, _ = user_data[uid]
+                all_embeddings.append(
+                    user_df.select("conversation_id", "embedding").with_columns(
+                        pl.lit(uid).alias("user_id")
                     )
+                )
 
         # Combine all embeddings and join with result
         if all_embeddings:
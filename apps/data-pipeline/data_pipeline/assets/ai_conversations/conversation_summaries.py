@@ -6,8 +6,10 @@ from dagster import (
     AssetIn,
     asset,
 )
-from json_repair import repair_json
 
+from data_pipeline.assets.ai_conversations.utils.parse_llm_json import (
+    parse_llm_json,
+)
 from data_pipeline.constants.custom_config import RowLimitConfig
 from data_pipeline.partitions import user_partitions_def
 from data_pipeline.resources.batch_inference.base_llm_resource import (
@@ -46,7 +48,7 @@ def get_conversation_summary_prompt_sequence(conversation: str) -> PromptSequenc
 
 def parse_conversation_summaries(completion: str) -> dict | None:
     try:
-        res = repair_json(completion, return_objects=True)
+        res = parse_llm_json(completion)
 
         # Now expect a JSON object with "is_sensitive", "summary" fields.
         if (
@@ -1,4 +1,3 @@
-import faiss
 import numpy as np
 import polars as pl
 from dagster import AssetExecutionContext, AssetIn, asset
@@ -23,11 +22,9 @@ def representatives_to_embed(
 ) -> pl.DataFrame:
     """
     Selects up to 300 representative conversations per user by performing agglomerative clustering
-    on the embeddings and choosing the conversation closest to each cluster's centroid using FAISS.
+    on the embeddings and choosing the conversation closest to each cluster's centroid.
     Outputs a DataFrame with (conversation_id, text_to_embed).
     """
-    # Extract embeddings as a numpy array
-    embeddings = np.array(conversations_embeddings["embedding"].to_list())
     n_conversations = len(conversations_embeddings)
 
     # If conversations are ≤ target, return all, ensuring required columns
@@ -36,6 +33,14 @@ def representatives_to_embed(
             ["conversation_id", "datetime_conversations"]
         ).rename({"datetime_conversations": "text_to_embed"})
 
+    # Extract embeddings as an (n, d) numpy array straight from the column buffer
+    embeddings = (
+        conversations_embeddings["embedding"]
+        .explode()
+        .to_numpy()
+        .reshape(n_conversations, -1)
+    )
+
     # Perform agglomerative clustering
     clustering = AgglomerativeClustering(
         n_clusters=REPRESENTATIVE_COUNT_TARGET, linkage="ward"
@@ -47,42 +52,39 @@ def representatives_to_embed(
         pl.Series("cluster_id", cluster_labels)
     )
 
+    conversation_ids = conversations_embeddings["conversation_id"]
     representative_candidates = []
 
-    # Process each cluster
-    for cluster_id, cluster_df in conversations_embeddings.group_by("cluster_id"):
-        embeddings_list = cluster_df["embedding"].to_list()
-        embeddings_array = np.array(embeddings_list)
+    # Normalize all embeddings to unit norm once, in place on a float32 copy
+    # (the raw embeddings are still needed for the centroids)
+    normalized_embeddings = embeddings.astype(np.float32)
+    norms = np.linalg.norm(normalized_embeddings, axis=1, keepdims=True)
+    # Avoid division by zero (though rare with embeddings)
+    norms[norms == 0] = 1e-10
+    normalized_embeddings /= norms
+
+    # Process each cluster, slicing its rows out of the embeddings matrices
+    # rather than rebuilding them from Python lists
+    for cluster_id in np.unique(cluster_labels):
+        cluster_indices = np.flatnonzero(cluster_labels == cluster_id)
 
-        if len(embeddings_array) == 1:
+        if len(cluster_indices) == 1:
             closest_idx_in_cluster = 0
         else:
-            # Normalize embeddings to unit norm
-            norms = np.linalg.norm(embeddings_array, axis=1, keepdims=True)
-            # Avoid division by zero (though rare with embeddings)
-            norms = np.where(norms == 0, 1e-10, norms)
-            normalized_embeddings = embeddings_array / norms
-
             # Compute centroid and normalize it
-            centroid = np.mean(embeddings_array, axis=0)
+            centroid = np.mean(embeddings[cluster_indices], axis=0)
             centroid_norm = np.linalg.norm(centroid)
             # Avoid division by zero
             centroid_norm = max(centroid_norm, 1e-10)
-            normalized_centroid = centroid / centroid_norm
-
-            # Create FAISS index with inner product (for cosine similarity on normalized vectors)
-            dim = embeddings_array.shape[1]
-            index = faiss.IndexFlatIP(dim)
-            # FAISS requires float32
-            index.add(normalized_embeddings.astype("float32"))
+            normalized_centroid = (centroid / centroid_norm).astype(np.float32)
 
-            # Search for the nearest neighbor (max inner product = min cosine distance)
-            D, I = index.search(normalized_centroid.astype("float32").reshape(1, -1), 1)
-            closest_idx_in_cluster = I[0][0]
+            # Nearest neighbor by max inner product (= min cosine distance),
+            # a single matrix-vector product instead of a per-cluster index
+            similarities = normalized_embeddings[cluster_indices] @ normalized_centroid
+            closest_idx_in_cluster = int(np.argmax(similarities))
 
         # Select representative conversation
-        representative_row = cluster_df.row(closest_idx_in_cluster, named=True)
-        conversation_id = representative_row["conversation_id"]
+        conversation_id = conversation_ids[int(cluster_indices[closest_idx_in_cluster])]
         representative_candidates.append(conversation_id)
 
     # Filter and format the output
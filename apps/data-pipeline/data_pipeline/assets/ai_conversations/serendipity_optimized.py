@@ -1,8 +1,11 @@
 import asyncio
 import datetime
+import heapq
 import traceback
 import uuid
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from math import ceil
 from typing import Dict, List, Set, cast
 
@@ -24,6 +27,7 @@ from data_pipeline.assets.ai_conversations.utils.serendipity import (
     get_out_df_schema,
     parse_serendipity_result,
     remap_indices_to_conversation_ids,
+    validate_remapped_indices,
 )
 from data_pipeline.constants.custom_config import RowLimitConfig
 from data_pipeline.partitions import user_partitions_def
@@ -45,49 +49,78 @@ class SerendipityOptimizedConfig(RowLimitConfig):
     max_llm_calls_global_budget: int = 200
 
 
+# Columns of cluster_categorizations used to build prompts, embeddings and the
+# index remapping; everything else is dropped before any processing
+CLUSTER_COLUMNS = [
+    "conversation_id",
+    "title",
+    "summary",
+    "start_date",
+    "start_time",
+    "embedding",
+    "user_id",
+    "cluster_id",
+    "match_group_id",
+    "category",
+]
+
+
 def _extract_conversation_summaries(
     df: pl.DataFrame,
     parsed_conversations: pl.DataFrame = None,
     is_current_user: bool = False,
 ) -> List[Dict]:
     """Extract and sort conversation summaries from a DataFrame."""
-    # Extract human questions from parsed_conversations if provided
-    raw_questions_by_conv = {}
+    summaries_df = df.with_columns(
+        date=pl.concat_str(["start_date", "start_time"], separator=" ")
+    )
+
+    # Attach human questions from parsed_conversations if provided
     if parsed_conversations is not None:
-        # Create a DataFrame with sorted questions for each conversation_id
-        questions_df = parsed_conversations.select(
-            ["conversation_id", "date", "time", "question"]
-        ).sort(["conversation_id", "date", "time"])
-
-        # Group by conversation_id and collect questions
-        for group, rows in questions_df.group_by("conversation_id"):
-            conv_id = group[0]
-            questions = [row["question"] for row in rows.iter_rows(named=True)]
-            raw_questions_by_conv[conv_id] = questions
-
-    summaries = []
-    for row in df.iter_rows(named=True):
-        conv_id = row["conversation_id"]
-        summary_dict = {
-            "row_idx": row["row_idx"],
-            "conversation_id": conv_id,
-            "title": row["title"],
-            "summary": row["summary"],
-            "date": f"{row['start_date']} {row['start_time']}",
-            "start_date": row["start_date"],
-            "start_time": row["start_time"],
-            "embedding": row["embedding"],
-            "raw_questions": raw_questions_by_conv.get(conv_id, []),
-            **({"user_id": row["user_id"]} if not is_current_user else {}),
-        }
-        summaries.append(summary_dict)
+        questions_df = parsed_conversations.group_by("conversation_id").agg(
+            raw_questions=pl.col("question").sort_by(["date", "time"])
+        )
+        summaries_df = summaries_df.join(
+            questions_df, on="conversation_id", how="left", maintain_order="left"
+        ).with_columns(pl.col("raw_questions").fill_null([]))
+    else:
+        summaries_df = summaries_df.with_columns(
+            raw_questions=pl.lit([], dtype=pl.List(pl.Utf8))
+        )
 
-    return sorted(summaries, key=lambda x: (x["start_date"], x["start_time"]))
+    return (
+        summaries_df.sort(["start_date", "start_time"], maintain_order=True)
+        .select(
+            "row_idx",
+            "conversation_id",
+            "title",
+            "summary",
+            "date",
+            "start_date",
+            "start_time",
+            "raw_questions",
+            *([] if is_current_user else ["user_id"]),
+        )
+        .to_dicts()
+    )
+
+
+def _embeddings_matrix(df: pl.DataFrame) -> np.ndarray:
+    """Stack the embedding column into a contiguous L2-normalized float32 matrix."""
+    if df.height == 0:
+        return np.empty((0, 0), dtype=np.float32)
+
+    embeddings = (
+        df["embedding"].explode().to_numpy().astype(np.float32).reshape(df.height, -1)
+    )
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.where(norms == 0, 1e-10, norms)
+    return embeddings
 
 
 def _create_path_entry(
     path_obj: Dict,
-    summaries: List[Dict],
+    idx_to_user: Dict[int, str],
     current_user_id: str,
     cluster_id: int,
     match_group_id: int,
@@ -102,13 +135,12 @@ def _create_path_entry(
     user1_indices = path_obj.get("user1_unique_indices", [])
     user2_indices = path_obj.get("user2_unique_indices", [])
 
-    # Identify user2 from summaries
-    idx_to_user = {s["row_idx"]: s["user_id"] for s in summaries}
-    user2_ids = {
-        idx_to_user[idx]
-        for idx in (user2_indices + common_indices)
-        if idx in idx_to_user
-    }
+    # Identify user2 from the other users' row indices
+    user2_ids = set()
+    for idx in chain(user2_indices, common_indices):
+        user_id = idx_to_user.get(idx)
+        if user_id is not None:
+            user2_ids.add(user_id)
     user2_id = next(iter(user2_ids)) if user2_ids else None
 
     return {
@@ -141,18 +173,36 @@ def _create_path_entry(
 def _filter_embeddings_without_exclusions(
     cluster_data: Dict,
     exclusions: Set[int],
-) -> tuple[list[np.ndarray], list[np.ndarray]]:
-    embeddings_current = [
-        s["embedding"]
-        for s in cluster_data["current_summaries"]
-        if s["row_idx"] not in exclusions
-    ]
-    embeddings_other = [
-        s["embedding"]
-        for s in cluster_data["summaries"]
-        if s["row_idx"] not in exclusions
-    ]
-    return embeddings_current, embeddings_other
+) -> tuple[np.ndarray, np.ndarray]:
+    excluded_indices = np.fromiter(exclusions, dtype=np.int64, count=len(exclusions))
+    current_mask = ~np.isin(cluster_data["current_row_idx"], excluded_indices)
+    other_mask = ~np.isin(cluster_data["row_idx"], excluded_indices)
+    return (
+        cluster_data["current_embeddings"][current_mask],
+        cluster_data["embeddings"][other_mask],
+    )
+
+
+def _load_parsed_conversations(
+    user_ids: List[str], logger
+) -> Dict[str, pl.DataFrame | None]:
+    """Load the parsed conversations of several users concurrently."""
+
+    def load(user_id: str) -> pl.DataFrame | None:
+        try:
+            return load_user_dataframe(user_id, "parsed_conversations")
+        except Exception as e:
+            logger.warning(
+                f"Could not load parsed conversations for user {user_id}: {e}"
+            )
+            return None
+
+    if not user_ids:
+        return {}
+
+    # Parquet reads release the GIL, so threads overlap the disk I/O and decoding
+    with ThreadPoolExecutor(max_workers=min(32, len(user_ids))) as executor:
+        return dict(zip(user_ids, executor.map(load, user_ids), strict=True))
 
 
 def _prepare_clusters(
@@ -166,40 +216,35 @@ def _prepare_clusters(
         logger.info("No conversation pairs found.")
         return {}
 
-    # Cache for other users' parsed conversations
-    other_users_parsed_conv_cache = {}
+    # Load every other user's parsed conversations concurrently, once
+    other_users_parsed_conv_cache = _load_parsed_conversations(
+        clusters_df.filter(pl.col("user_id") != current_user_id)["user_id"]
+        .unique()
+        .to_list(),
+        logger,
+    )
 
     cluster_data = {}
-    for cluster_id, cluster_df in clusters_df.group_by("cluster_id"):
-        cluster_id = cluster_id[0]
-        user1_df = cluster_df.filter(pl.col("user_id") == current_user_id)
+    for (cluster_id,), cluster_df in clusters_df.partition_by(
+        "cluster_id", as_dict=True
+    ).items():
+        is_current_user = cluster_df["user_id"] == current_user_id
+        user1_df = cluster_df.filter(is_current_user)
         if user1_df.height == 0:
             continue
 
         # Get other users' data
-        other_users_df = cluster_df.filter(pl.col("user_id") != current_user_id)
+        other_users_df = cluster_df.filter(~is_current_user)
 
         # Get unique other user IDs
         other_user_ids = other_users_df.select("user_id").unique().to_series().to_list()
 
-        # Load parsed conversations for other users
-        other_users_parsed_convs = []
-        for user_id in other_user_ids:
-            if user_id not in other_users_parsed_conv_cache:
-                try:
-                    # Load this user's parsed conversations
-                    user_parsed_conv = load_user_dataframe(
-                        user_id, "parsed_conversations"
-                    )
-                    other_users_parsed_conv_cache[user_id] = user_parsed_conv
-                except Exception as e:
-                    logger.warning(
-                        f"Could not load parsed conversations for user {user_id}: {e}"
-                    )
-                    other_users_parsed_conv_cache[user_id] = None
-
-            if other_users_parsed_conv_cache[user_id] is not None:
-                other_users_parsed_convs.append(other_users_parsed_conv_cache[user_id])
+        # Collect the parsed conversations of the other users
+        other_users_parsed_convs = [
+            other_users_parsed_conv_cache[user_id]
+            for user_id in other_user_ids
+            if other_users_parsed_conv_cache[user_id] is not None
+        ]
 
         # Combine all other users' parsed conversations
         other_users_parsed_conv = (
@@ -213,6 +258,19 @@ def _prepare_clusters(
             "summaries": _extract_conversation_summaries(
                 other_users_df, other_users_parsed_conv
             ),
+            # Row indices and embedding matrices aligned with each other, so
+            # that excluded conversations can be masked out without a Python scan
+            "current_row_idx": user1_df["row_idx"].to_numpy(),
+            "current_embeddings": _embeddings_matrix(user1_df),
+            "row_idx": other_users_df["row_idx"].to_numpy(),
+            "embeddings": _embeddings_matrix(other_users_df),
+            "idx_to_user": dict(
+                zip(
+                    other_users_df["row_idx"].to_list(),
+                    other_users_df["user_id"].to_list(),
+                    strict=True,
+                )
+            ),
             "paths_found": 0,
             "iteration": 0,
             "match_group_id": cluster_df["match_group_id"][0],
@@ -264,12 +322,22 @@ async def _generate_paths(
         if not initial_cluster_ids:
             continue
 
-        # Initialize scaler for current category
+        # Initialize scaler for current category. The bipartite matches are
+        # CPU-bound, so they run in worker threads to keep the event loop free
+        # for the other match groups' in-flight LLM calls
         initial_scores = [
-            calculate_balance_scores(
-                *_filter_embeddings_without_exclusions(cluster_data[cid], exclusions)
-            )[1]
-            for cid in initial_cluster_ids
+            scores
+            for _, scores in await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        calculate_balance_scores,
+                        *_filter_embeddings_without_exclusions(
+                            cluster_data[cid], exclusions
+                        ),
+                    )
+                    for cid in initial_cluster_ids
+                )
+            )
         ]
 
         # Filter out inf scores
@@ -296,11 +364,11 @@ async def _generate_paths(
             )
         )
 
-        # Initialize active clusters with their current balance scores
+        # Min-heap of active clusters keyed by their current balance score
         active_clusters = [
             (
-                cid,
                 sum_balance_scores(*standardized_metrics[i]),
+                cid,
                 {
                     "imbalance": standardized_metrics[i][0],
                     "magnitude_factor": standardized_metrics[i][1],
@@ -309,6 +377,7 @@ async def _generate_paths(
             )
             for i, cid in enumerate(valid_cluster_ids)
         ]
+        heapq.heapify(active_clusters)
 
         # Process clusters dynamically within this category
         while (
@@ -325,22 +394,20 @@ async def _generate_paths(
                 )
             )
         ):
-            # Sort by balance score and select the top cluster
-            active_clusters.sort(
-                key=lambda x: x[1]
-            )  # Smallest score (closest to 1) first
-            cid, balance_score, balance_scores_detailed = active_clusters[
-                0
-            ]  # Get the top cluster
+            # Peek the cluster with the smallest score (closest to 1)
+            balance_score, cid, balance_scores_detailed = active_clusters[0]
             data = cluster_data[cid]
 
-            # Generate prompt with remaining conversations
+            # Generate prompt with remaining conversations. This is pure-Python
+            # string building that holds the GIL, so it stays on the event loop
             prompt = generate_serendipity_prompt(
-                data["current_summaries"], data["summaries"], exclusions
+                data["current_summaries"],
+                data["summaries"],
+                exclusions,
             )
             if not prompt:
                 # Cluster can't generate more paths; remove it
-                active_clusters.pop(0)
+                heapq.heappop(active_clusters)
                 continue
 
             # Safety check before calling LLM
@@ -371,7 +438,7 @@ async def _generate_paths(
             # Create and store the path
             path = _create_path_entry(
                 path_obj,
-                data["summaries"],
+                data["idx_to_user"],
                 current_user_id,
                 cid,
                 data["match_group_id"],
@@ -386,12 +453,13 @@ async def _generate_paths(
             data["iteration"] += 1
 
             # Recalculate balance score for this cluster
-            new_balance_score, new_scores_detailed = calculate_balance_scores(
-                *_filter_embeddings_without_exclusions(data, exclusions)
+            new_balance_score, new_scores_detailed = await asyncio.to_thread(
+                calculate_balance_scores,
+                *_filter_embeddings_without_exclusions(data, exclusions),
             )
             if new_balance_score == FINITE_INF:
                 # No remaining conversations; remove cluster
-                active_clusters.pop(0)
+                heapq.heappop(active_clusters)
             else:
                 # Scale with the same scaler
                 new_standardized_metrics = scaler.transform(
@@ -407,15 +475,18 @@ async def _generate_paths(
                 )
                 new_standardized_metrics = cast(np.ndarray, new_standardized_metrics)
                 new_balance_score = sum_balance_scores(*new_standardized_metrics[0])
-                # Update the cluster's score in the list
-                active_clusters[0] = (
-                    cid,
-                    new_balance_score,
-                    {
-                        "imbalance": new_standardized_metrics[0][0],
-                        "magnitude_factor": new_standardized_metrics[0][1],
-                        "dist": new_standardized_metrics[0][2],
-                    },
+                # Update the cluster's score and restore the heap order
+                heapq.heapreplace(
+                    active_clusters,
+                    (
+                        new_balance_score,
+                        cid,
+                        {
+                            "imbalance": new_standardized_metrics[0][0],
+                            "magnitude_factor": new_standardized_metrics[0][1],
+                            "dist": new_standardized_metrics[0][2],
+                        },
+                    ),
                 )
 
         if not active_clusters:
@@ -425,46 +496,81 @@ async def _generate_paths(
     return [path for paths in paths_by_category.values() for path in paths]
 
 
-def _fix_duplicates(df: pl.DataFrame, logger) -> pl.DataFrame:
-    """Validate and remove duplicate indices within match groups.
+INDEX_COLUMNS = ["common_indices", "user1_indices", "user2_indices"]
+
 
-    For each match group (based on "match_group_id"), this function iterates over the rows,
+def _count_indices(df: pl.DataFrame) -> int:
+    """Count all the row indices referenced by the paths."""
+    return df.select(
+        pl.sum_horizontal(pl.col(col).list.len().sum() for col in INDEX_COLUMNS)
+    ).item()
+
+
+def _fix_duplicates(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """Remove duplicate indices within match groups.
+
+    For each match group (based on "match_group_id"), the rows are scanned in order,
     and for each of the list columns ["common_indices", "user1_indices", "user2_indices"],
-    it removes any index that has already been encountered in that match group (keeping only the first occurrence).
+    any index that has already been encountered in that match group is removed (keeping only the first occurrence).
 
     Args:
-        df: DataFrame containing the path data.
-        logger: Logger for recording status.
+        lf: LazyFrame containing the path data.
 
     Returns:
-        A new DataFrame with duplicate indices removed.
+        A new LazyFrame with duplicate indices removed.
     """
-    total_removed = 0
-    new_rows = []
-    # Process by unique match_group_id values
-    for mg_id in df["match_group_id"].unique().to_list():
-        group_df = df.filter(pl.col("match_group_id") == mg_id)
-        seen: set = set()
-        for row in group_df.iter_rows(named=True):
-            new_row = row.copy()
-            for col in ["common_indices", "user1_indices", "user2_indices"]:
-                new_list = []
-                for item in row[col]:
-                    if item in seen:
-                        total_removed += 1
-                    else:
-                        seen.add(item)
-                        new_list.append(item)
-                new_row[col] = new_list
-            new_rows.append(new_row)
+    schema = lf.collect_schema()
+    lf = lf.with_row_index("_row_nr")
+
+    # One row per index, tagged with the list it came from and ordered as the
+    # indices would be visited row by row
+    exploded = (
+        lf.select(
+            "_row_nr",
+            "match_group_id",
+            pl.concat_list(
+                [
+                    pl.col(col).list.eval(
+                        pl.struct(
+                            idx=pl.element(),
+                            _col_nr=pl.lit(col_nr, dtype=pl.UInt32),
+                        )
+                    )
+                    for col_nr, col in enumerate(INDEX_COLUMNS)
+                ]
+            ).alias("_tagged"),
+        )
+        .explode("_tagged")
+        .unnest("_tagged")
+        .drop_nulls("idx")
+    )
 
-    if total_removed == 0:
-        logger.info("No duplicates found within match groups.")
-    else:
-        logger.info(f"Removed {total_removed} duplicate entries across match groups.")
+    # Keep the first occurrence of each index within its match group and
+    # implode the survivors back into their original row and column
+    kept_lists = (
+        exploded.unique(
+            subset=["match_group_id", "idx"], keep="first", maintain_order=True
+        )
+        .group_by(["_row_nr", "_col_nr"], maintain_order=True)
+        .agg("idx")
+    )
+    for col_nr, col in enumerate(INDEX_COLUMNS):
+        lf = (
+            lf.drop(col)
+            .join(
+                kept_lists.filter(pl.col("_col_nr") == col_nr).select(
+                    "_row_nr", pl.col("idx").alias(col)
+                ),
+                on="_row_nr",
+                how="left",
+            )
+            .with_columns(pl.col(col).fill_null([]))
+        )
 
-    # Return a new DataFrame with the same schema as the original.
-    return pl.DataFrame(new_rows, schema=df.schema)
+    # Return a new LazyFrame with the same schema as the original.
+    return lf.sort("_row_nr").select(
+        pl.col(name).cast(dtype) for name, dtype in schema.items()
+    )
 
 
 @asset(
@@ -498,7 +604,9 @@ async def serendipity_optimized(
     current_user_id = context.partition_key
     logger = context.log
 
-    clusters_df = cluster_categorizations.drop("row_idx").with_row_count("row_idx")
+    clusters_df = cluster_categorizations.select(CLUSTER_COLUMNS).with_row_count(
+        "row_idx"
+    )
 
     # Prepare cluster data
     cluster_data = _prepare_clusters(
@@ -550,10 +658,21 @@ async def serendipity_optimized(
     if not paths:
         return pl.DataFrame(schema=get_out_df_schema())
 
-    # Build and validate result DataFrame
-    result_df = pl.DataFrame(paths, schema_overrides=get_out_df_schema(), strict=False)
+    # Build, deduplicate and remap the result DataFrame in a single lazy query
+    result_df = (
+        pl.LazyFrame(paths, schema_overrides=get_out_df_schema(), strict=False)
+        .pipe(_fix_duplicates)
+        .pipe(remap_indices_to_conversation_ids, clusters_df)
+        .collect()
+    )
+
+    total_removed = sum(len(path[col]) for path in paths for col in INDEX_COLUMNS)
+    total_removed -= _count_indices(result_df)
+    if total_removed == 0:
+        logger.info("No duplicates found within match groups.")
+    else:
+        logger.info(f"Removed {total_removed} duplicate entries across match groups.")
 
-    result_df = _fix_duplicates(result_df, logger)
-    result_df = remap_indices_to_conversation_ids(result_df, clusters_df)
+    validate_remapped_indices(result_df)
 
     return result_df
@@ -1,8 +1,8 @@
+import faiss
 import numpy as np
 import polars as pl
 from dagster import AssetExecutionContext, AssetIn, asset
 from pydantic import Field
-from sklearn.cluster import AgglomerativeClustering
 
 from data_pipeline.constants.custom_config import RowLimitConfig
 from data_pipeline.partitions import user_partitions_def
@@ -33,7 +33,7 @@ def skeletons_clusters(
     Groups similar conversations into clusters for easier analysis.
     
     This asset:
-    - Groups semantically similar conversations using AgglomerativeClustering
+    - Groups semantically similar conversations using k-means
     - Identifies patterns in user behavior and interests
     - Visualizes cluster distribution for analysis
     - Creates organization structure for categorization
@@ -51,13 +51,22 @@ def skeletons_clusters(
     Returns:
         DataFrame containing skeletons with assigned clusters
     """
-    conv_embeddings = np.stack(skeletons_embeddings["embedding"].to_list())
+    conv_embeddings = np.ascontiguousarray(
+        skeletons_embeddings["embedding"]
+        .explode()
+        .to_numpy()
+        .reshape(skeletons_embeddings.height, -1),
+        dtype=np.float32,
+    )
 
-    # Perform agglomerative clustering
-    clustering = AgglomerativeClustering(
-        n_clusters=config.n_clusters, metric="euclidean", linkage="ward"
+    # Perform k-means clustering, which avoids the N^2 distance matrix of
+    # agglomerative clustering
+    kmeans = faiss.Kmeans(
+        conv_embeddings.shape[1], config.n_clusters, niter=20, nredo=3, seed=0
     )
-    cluster_labels = clustering.fit_predict(conv_embeddings)
+    kmeans.train(conv_embeddings)
+    _, nearest_centroids = kmeans.index.search(conv_embeddings, 1)
+    cluster_labels = nearest_centroids.ravel()
 
     # Split labels back into taxonomy and conversation parts
     conversation_clusters = cluster_labels
@@ -15,13 +15,10 @@ WEIGHTS = {
 
 
 def sum_balance_scores(imbalance: float, magnitude_factor: float, dist: float) -> float:
-    return sum(
-        WEIGHTS[k] * v
-        for k, v in {
-            "imbalance": imbalance,
-            "magnitude_factor": magnitude_factor,
-            "dist": dist,
-        }.items()
+    return (
+        WEIGHTS["imbalance"] * imbalance
+        + WEIGHTS["magnitude_factor"] * magnitude_factor
+        + WEIGHTS["dist"] * dist
     )
 
 
@@ -29,11 +26,14 @@ FINITE_INF = 9999.9
 
 
 def calculate_balance_scores(
-    embeddings_current: list[np.ndarray],
-    embeddings_other: list[np.ndarray],
+    embeddings_current: np.ndarray,
+    embeddings_other: np.ndarray,
 ) -> tuple[float, Dict[str, float]]:
     """Calculate balance score based on remaining conversations.
 
+    Takes the (n, d) normalized embedding matrices of the remaining
+    conversations on each side, which are used as-is without copying.
+
     Returns a score that prioritizes:
     1. Larger total number of conversations
     2. More balanced ratio between sides
@@ -60,7 +60,7 @@ def calculate_balance_scores(
     magnitude_factor = 0.0
 
     # Calculate cosine similarity between embeddings
-    sim = get_bipartite_match(np.array(embeddings_current), np.array(embeddings_other))
+    sim = get_bipartite_match(embeddings_current, embeddings_other)
     dist = 1 - sim
 
     return float(imbalance) + float(magnitude_factor) + float(dist), {
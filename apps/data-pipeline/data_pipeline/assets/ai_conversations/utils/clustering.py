@@ -8,12 +8,16 @@ import time
 from math import ceil
 from typing import Callable, Literal, Optional, cast
 
+import faiss
 import hdbscan
 import numpy as np
 import umap
+from scipy.cluster import hierarchy
 from sklearn.cluster import AgglomerativeClustering
 from sklearn.decomposition import PCA
 
+from data_pipeline.constants.environments import USE_CUML
+
 
 def agglomerative_clustering(
     embeddings: np.ndarray,
@@ -46,7 +50,8 @@ def agglomerative_clustering(
         clustering = AgglomerativeClustering(
             n_clusters=n_clusters,
             distance_threshold=distance_threshold,
-            compute_full_tree=True,
+            # Only build the whole tree when the distance threshold needs it
+            compute_full_tree="auto" if distance_threshold is None else True,
             linkage=linkage,
         )
         return clustering.fit_predict(embeddings)
@@ -57,18 +62,22 @@ def agglomerative_clustering(
     previous_largest_cluster_size = float("inf")
     previous_cluster_labels = None
 
+    # Build the merge tree once and cut it at each candidate number of
+    # clusters, rather than refitting the whole clustering on every attempt
+    linkage_matrix = hierarchy.linkage(embeddings, method=linkage)
+
     for iteration in range(max_cluster_iterations):
         log(
             f"Attempt {iteration + 1}: Creating {current_n_clusters} clusters for {n_items} total items"
         )
 
-        # Cluster the embeddings
-        clustering = AgglomerativeClustering(
-            n_clusters=current_n_clusters,
-            compute_full_tree=True,
-            linkage=linkage,
+        # Cut the tree into the requested number of clusters (0-based labels)
+        current_labels = (
+            hierarchy.fcluster(
+                linkage_matrix, t=current_n_clusters, criterion="maxclust"
+            )
+            - 1
         )
-        current_labels = clustering.fit_predict(embeddings)
 
         # Check if any cluster exceeds the maximum size
         cluster_sizes = np.bincount(current_labels)
@@ -118,7 +127,8 @@ def hdbscan_clustering(
     cluster_selection_epsilon: float = 0,
 ) -> np.ndarray:
     """
-    Perform HDBSCAN clustering on embeddings with soft assignment to ensure no noise points.
+    Perform HDBSCAN clustering on embeddings, assigning noise points to the cluster
+    of their nearest clustered neighbor so that there are no noise points.
 
     Args:
         embeddings: Pre-normalized embedding array
@@ -130,22 +140,69 @@ def hdbscan_clustering(
         Cluster labels for each embedding with no noise points (-1)
     """
 
-    # Create and fit the clusterer with prediction_data=True for soft clustering
-    clusterer = hdbscan.HDBSCAN(
-        min_cluster_size=min_cluster_size,
-        min_samples=min_samples,
-        cluster_selection_epsilon=cluster_selection_epsilon,
-        metric="euclidean",
-        prediction_data=True,  # Required for soft clustering
-    ).fit(embeddings)
+    if USE_CUML:
+        import cupy as cp
+        from cuml.cluster import HDBSCAN as CumlHDBSCAN
+
+        clusterer = CumlHDBSCAN(
+            min_cluster_size=min_cluster_size,
+            min_samples=min_samples,
+            cluster_selection_epsilon=cluster_selection_epsilon,
+            metric="euclidean",
+        ).fit(cp.asarray(embeddings))
+        labels = cp.asnumpy(clusterer.labels_)
+    else:
+        # Core distances are computed on all cores instead of the default 4
+        clusterer = hdbscan.HDBSCAN(
+            min_cluster_size=min_cluster_size,
+            min_samples=min_samples,
+            cluster_selection_epsilon=cluster_selection_epsilon,
+            metric="euclidean",
+            core_dist_n_jobs=-1,
+        ).fit(embeddings)
+        labels = clusterer.labels_.copy()
+    noise = labels == -1
+
+    # If no cluster was found, keep all the points together
+    if noise.all():
+        return np.zeros_like(labels)
+
+    # A single nearest neighbor search over the noise points replaces the
+    # (n, n_clusters) soft membership matrix
+    if noise.any():
+        _, nearest = faiss.knn(
+            np.ascontiguousarray(embeddings[noise], dtype=np.float32),
+            np.ascontiguousarray(embeddings[~noise], dtype=np.float32),
+            1,
+        )
+        labels[noise] = labels[~noise][nearest[:, 0]]
 
-    membership_vectors = hdbscan.all_points_membership_vectors(clusterer)
+    return labels
 
-    # all_points_membership_vectors might return a 1-dimensional array if there is only one cluster
-    if membership_vectors.ndim == 1:
-        return membership_vectors
+
+def _reduce_dimensions_gpu(
+    embeddings: np.ndarray,
+    method: Literal["pca", "umap"],
+    n_components: int,
+) -> np.ndarray:
+    """Run PCA or UMAP with cuML, returning the reduced embeddings on the host."""
+    import cupy as cp
+
+    if method == "pca":
+        from cuml.decomposition import PCA as CumlPCA
+
+        reducer = CumlPCA(n_components=n_components)
+    elif method == "umap":
+        from cuml.manifold import UMAP as CumlUMAP
+
+        reducer = CumlUMAP(n_components=n_components, verbose=True)
     else:
-        return membership_vectors.argmax(axis=1)
+        raise ValueError(f"Unknown dimension reduction method: {method}")
+
+    # Only the full-width input crosses to the device; the reduced matrix
+    # coming back is small
+    reduced = reducer.fit_transform(cp.asarray(embeddings))
+    return cp.asnumpy(reduced)
 
 
 AGGLOMERATIVE_CLUSTERING_CONFIG = {
@@ -182,19 +239,32 @@ def cluster_embeddings(
 
     Returns:
         Cluster labels for each embedding.
-        For HDBSCAN, soft clustering ensures all points are assigned to clusters (no -1 labels).
+        For HDBSCAN, noise points are assigned to their nearest cluster (no -1 labels).
     """
-    # Merge embeddings (assumed to be already normalized)
-    merged_embeddings = np.vstack([emb1_array, emb2_array])
+    if dimension_reduction_method not in ("pca", "umap"):
+        raise ValueError(
+            f"Unknown dimension reduction method: {dimension_reduction_method}"
+        )
+
+    # Merge embeddings (assumed to be already normalized) into a single
+    # contiguous float32 matrix, so no reduction step has to copy or upcast it
+    merged_embeddings = np.vstack([emb1_array, emb2_array], dtype=np.float32)
 
     start_time = time.time()
 
     # Ensure n_components is not greater than the number of embeddings
     n_components = min(dimension_reduction_n_components, merged_embeddings.shape[0] - 2)
 
-    if dimension_reduction_method == "pca":
+    if USE_CUML:
+        merged_embeddings = _reduce_dimensions_gpu(
+            merged_embeddings, dimension_reduction_method, n_components
+        )
+    elif dimension_reduction_method == "pca":
+        # Randomized SVD only computes the leading components
         merged_embeddings = PCA(
             n_components=n_components,
+            svd_solver="randomized",
+            random_state=0,
         ).fit_transform(merged_embeddings)
     elif dimension_reduction_method == "umap":
         merged_embeddings = umap.UMAP(
@@ -9,8 +9,8 @@ def get_materialized_partitions(context: AssetExecutionContext, asset_name: str)
     materialized_partitions = context.instance.get_materialized_partitions(
         context.asset_key_for_input(asset_name)
     )
-    # Fetch current dynamic partitions
-    current_dynamic_partitions = context.instance.get_dynamic_partitions("users")
+    # Fetch current dynamic partitions as a set for constant-time lookups
+    current_dynamic_partitions = set(context.instance.get_dynamic_partitions("users"))
     # Filter out deleted partitions
     filtered_partitions = [
         partition
@@ -1,13 +1,33 @@
-import heapq
+from concurrent.futures import ThreadPoolExecutor
 
-import faiss
 import numpy as np
+import polars as pl
 from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
 
 from data_pipeline.assets.ai_conversations.utils.load_user_dataframe import (
     load_user_dataframe,
 )
 
+# Above this many embeddings per side, solve the assignment approximately on a
+# k-NN graph instead of exactly on the dense matrix (see sparse_assignment)
+SPARSE_MATCH_MIN_SIZE = 500
+SPARSE_MATCH_NEIGHBORS = 32
+
+_rng = np.random.default_rng()
+
+
+def embeddings_to_array(df: pl.DataFrame) -> np.ndarray:
+    """Read the embedding column straight from its buffer into an (n, d) matrix."""
+    return (
+        df["embedding"]
+        .explode()
+        .to_numpy()
+        .astype(np.float32, copy=False)
+        .reshape(df.height, -1)
+    )
+
 
 def load_user_embeddings(user_id):
     """Load user data and embeddings, returning a tuple of (df, embeddings_array)."""
@@ -15,14 +35,7 @@ def load_user_embeddings(user_id):
     if df.is_empty():
         return None, None
 
-    df = df.with_row_count("row_idx")
-    emb_list = df["embedding"].to_list()
-
-    if not emb_list:
-        return None, None
-
-    emb_array = np.array(emb_list, dtype=np.float32)
-    return df, emb_array
+    return df, embeddings_to_array(df)
 
 
 def get_bipartite_match(
@@ -43,46 +56,72 @@ def get_bipartite_match(
     assert current_user_embeddings.ndim == 2 and user_embeddings.ndim == 2
     assert current_user_embeddings.shape[1] == user_embeddings.shape[1]
 
-    # Determine which set of embeddings to use as query vs. index
-    # For efficiency, build index on the larger set
-    if current_user_embeddings.shape[0] <= user_embeddings.shape[0]:
-        query_embeddings = current_user_embeddings
-        index_embeddings = user_embeddings
-        query_is_current = True
-    else:
-        query_embeddings = user_embeddings
-        index_embeddings = current_user_embeddings
-        query_is_current = False
-
-    # Build FAISS index with inner product similarity (for normalized vectors = cosine)
-    index = faiss.IndexFlatIP(index_embeddings.shape[1])
-    index.add(index_embeddings)
-
-    # Compute all pairwise similarities
-    # For each query embedding, get similarity to all index embeddings
-    similarity_matrix = np.zeros((query_embeddings.shape[0], index_embeddings.shape[0]))
-    for i, query_emb in enumerate(query_embeddings):
-        # Reshape to (1, d) for FAISS
-        query_emb = query_emb.reshape(1, -1)
-        # Get similarities to all index embeddings
-        distances, _ = index.search(query_emb, index_embeddings.shape[0])
-        similarity_matrix[i] = distances[0]
-
-    # Transpose if needed to maintain correct orientation
-    if not query_is_current:
-        similarity_matrix = similarity_matrix.T
-
-    # Create cost matrix (negative similarity since linear_sum_assignment minimizes)
-    cost_matrix = -similarity_matrix
+    # Compute all pairwise similarities with a single inner product matmul
+    # (cosine for normalized vectors), keeping each column aligned with its
+    # embedding in user_embeddings
+    similarity_matrix = (
+        np.asarray(current_user_embeddings, dtype=np.float32)
+        @ np.asarray(user_embeddings, dtype=np.float32).T
+    )
 
     # Find optimal assignment
-    row_ind, col_ind = linear_sum_assignment(cost_matrix)
+    if min(similarity_matrix.shape) >= SPARSE_MATCH_MIN_SIZE:
+        row_ind, col_ind = sparse_assignment(similarity_matrix)
+    else:
+        row_ind, col_ind = linear_sum_assignment(similarity_matrix, maximize=True)
 
     # Return average similarity from the optimal assignment
-    optimal_sim = -np.mean(cost_matrix[row_ind, col_ind])
+    optimal_sim = np.mean(similarity_matrix[row_ind, col_ind])
     return float(optimal_sim)
 
 
+def sparse_assignment(
+    similarity_matrix: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Maximize the assignment over each row's nearest neighbors only, falling back
+    to the dense solver when that graph has no full matching.
+
+    This trades exactness for speed: the result is only optimal over the k-NN
+    graph, so it can be slightly below the dense linear_sum_assignment optimum
+    whenever an optimal pair lies outside a row's SPARSE_MATCH_NEIGHBORS
+    nearest columns. When the k-NN graph has no full matching at all, the
+    exact dense solver is used instead.
+    """
+    # Keep the smaller side as rows, so every row has to be matched
+    transposed = similarity_matrix.shape[0] > similarity_matrix.shape[1]
+    sim = similarity_matrix.T if transposed else similarity_matrix
+    n_rows, n_cols = sim.shape
+    k = min(SPARSE_MATCH_NEIGHBORS, n_cols)
+
+    neighbors = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+    # Costs must be nonzero, and 2 - sim is always >= 1 for cosine similarities
+    costs = 2.0 - np.take_along_axis(sim, neighbors, axis=1)
+    graph = csr_matrix(
+        (costs.ravel(), neighbors.ravel(), np.arange(0, n_rows * k + 1, k)),
+        shape=(n_rows, n_cols),
+    )
+
+    try:
+        row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+    except ValueError:
+        row_ind, col_ind = linear_sum_assignment(sim, maximize=True)
+
+    return (col_ind, row_ind) if transposed else (row_ind, col_ind)
+
+
+def sample_embeddings(embeddings: np.ndarray, sample_size: int) -> np.ndarray:
+    """Sample up to sample_size rows as a contiguous float32 matrix."""
+    if sample_size < embeddings.shape[0]:
+        # Samples in O(sample_size) for large n, unlike the legacy full permutation
+        indices = _rng.choice(
+            embeddings.shape[0], sample_size, replace=False, shuffle=False
+        )
+        embeddings = embeddings[indices]
+
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
 def get_approx_bipartite_match(
     current_user_embeddings: np.ndarray,
     user_embeddings: np.ndarray,
@@ -103,23 +142,14 @@ def get_approx_bipartite_match(
     assert current_user_embeddings.shape[1] == user_embeddings.shape[1]
 
     # Sample embeddings if sample_size is less than the total number available
-    if sample_size < current_user_embeddings.shape[0]:
-        indices = np.random.choice(
-            current_user_embeddings.shape[0], sample_size, replace=False
-        )
-        search_embeddings = current_user_embeddings[indices]
-    else:
-        search_embeddings = current_user_embeddings
-
-    # Build FAISS index with target user's embeddings
-    index = faiss.IndexFlatIP(user_embeddings.shape[1])  # Inner product
-    index.add(user_embeddings)
+    search_embeddings = sample_embeddings(current_user_embeddings, sample_size)
 
-    # Search with sampled embeddings
-    distances, _ = index.search(search_embeddings, 1)
+    # A single inner product matmul is cheaper than building a FAISS index
+    # for a one-shot top-1 search at these sizes
+    similarities = search_embeddings @ np.asarray(user_embeddings, dtype=np.float32).T
 
-    # Average the cosine similarities
-    avg_cosine_sim = np.mean(distances[:, 0])
+    # Average the best cosine similarity of each sampled embedding
+    avg_cosine_sim = np.mean(similarities.max(axis=1))
     return float(avg_cosine_sim)
 
 
@@ -130,7 +160,7 @@ def find_top_k_users(
     sample_size: int = 100,
 ) -> list[tuple[str, float]]:
     """
-    Find the top K most similar users by loading embeddings one at a time.
+    Find the top K most similar users, loading and scoring users concurrently.
 
     Args:
         current_user_embeddings: Shape (n, d), normalized embeddings for current user
@@ -144,21 +174,38 @@ def find_top_k_users(
     if not other_user_ids:
         return []
 
-    top_k_heap = []
-    for user_id in other_user_ids:
-        # Load embeddings for one user at a time
-        df, embeddings = load_user_embeddings(
-            user_id
-        )  # Assume this function is available
-        if embeddings is not None:
-            similarity = get_approx_bipartite_match(
-                current_user_embeddings, embeddings, sample_size
-            )
-            if len(top_k_heap) < top_k:
-                heapq.heappush(top_k_heap, (similarity, user_id))
-            elif similarity > top_k_heap[0][0]:
-                heapq.heappushpop(top_k_heap, (similarity, user_id))
-
-    # Sort the heap results in descending order
-    top_k_users = sorted(top_k_heap, key=lambda x: x[0], reverse=True)
-    return [(user_id, similarity) for similarity, user_id in top_k_users]
+    # Sample the current user's embeddings once and reuse them for every user
+    query_embeddings = sample_embeddings(current_user_embeddings, sample_size)
+
+    def get_user_similarity(user_id: str) -> float | None:
+        # Only the embeddings are needed here, so skip decoding the other columns
+        df = load_user_dataframe(
+            user_id, "conversations_embeddings", columns=["embedding"]
+        )
+        if df.is_empty():
+            return None
+        return get_approx_bipartite_match(
+            query_embeddings, embeddings_to_array(df), sample_size
+        )
+
+    # Both the Parquet reads and the matmuls release the GIL. Each worker drops
+    # its user's embeddings once scored, so memory stays bounded by the pool size
+    with ThreadPoolExecutor(max_workers=min(32, len(other_user_ids))) as executor:
+        similarities = list(executor.map(get_user_similarity, other_user_ids))
+
+    # Skip users without embeddings
+    user_ids = [
+        user_id
+        for user_id, similarity in zip(other_user_ids, similarities, strict=True)
+        if similarity is not None
+    ]
+    scores = np.array([s for s in similarities if s is not None], dtype=np.float64)
+
+    # Select the top K in linear time, then sort only those in descending order
+    if top_k < len(scores):
+        top_indices = np.argpartition(-scores, top_k)[:top_k]
+    else:
+        top_indices = np.arange(len(scores))
+    top_indices = top_indices[np.argsort(-scores[top_indices], kind="stable")]
+
+    return [(user_ids[i], float(scores[i])) for i in top_indices]
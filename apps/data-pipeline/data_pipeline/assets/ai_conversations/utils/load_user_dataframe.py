@@ -3,6 +3,11 @@ import polars as pl
 from data_pipeline.constants.environments import DAGSTER_STORAGE_DIRECTORY
 
 
-def load_user_dataframe(user_id: str, asset_name: str) -> pl.DataFrame:
-    """Load a user's dataframe from Parquet."""
-    return pl.read_parquet(DAGSTER_STORAGE_DIRECTORY / asset_name / f"{user_id}.snappy")
+def load_user_dataframe(
+    user_id: str, asset_name: str, columns: list[str] | None = None
+) -> pl.DataFrame:
+    """Load a user's dataframe from Parquet, optionally only the given columns."""
+    return pl.read_parquet(
+        DAGSTER_STORAGE_DIRECTORY / asset_name / f"{user_id}.snappy",
+        columns=columns,
+    )
@@ -0,0 +1,20 @@
+import json
+
+from json_repair import repair_json
+
+
+def parse_llm_json(content: str):
+    """Parse a JSON LLM response, only running json_repair when it is malformed."""
+    # Unwrap a Markdown code fence if the model added one
+    _, fence, fenced_content = content.partition("```json")
+    if fence:
+        content = fenced_content.rpartition("```")[0] or fenced_content
+
+    # A truncated response can't be valid JSON, so don't bother parsing it twice
+    if content.rstrip().endswith(("}", "]")):
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            pass
+
+    return repair_json(content, return_objects=True)
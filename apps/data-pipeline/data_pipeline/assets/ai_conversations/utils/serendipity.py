@@ -3,21 +3,22 @@
 from textwrap import dedent
 from typing import Dict, List, Optional, Set
 
-import numpy as np
 import polars as pl
 from dagster import get_dagster_logger
-from json_repair import repair_json
 
+from data_pipeline.assets.ai_conversations.utils.parse_llm_json import (
+    parse_llm_json,
+)
 
-def _prepare_user_texts(
-    user_summaries: List[Dict], excluded_indices: Set[int]
-) -> Optional[str]:
-    filtered_summaries = [
-        s for s in user_summaries if s["row_idx"] not in excluded_indices
-    ]
-    texts = []
-    for s in filtered_summaries:
-        row_idx = s["row_idx"]
+
+def _get_summary_text(s: Dict) -> str:
+    """Render a summary for the prompt, caching the text on the summary itself.
+
+    Only the set of excluded summaries changes between prompts of the same
+    cluster, so each summary is rendered once and reused by later prompts.
+    """
+    text = s.get("prompt_text")
+    if text is None:
         # Format human questions if they exist
         questions_section = ""
         if s.get("raw_questions") and len(s["raw_questions"]) > 0:
@@ -25,13 +26,61 @@ def _prepare_user_texts(
             questions_text = "\n  - ".join([q for q in questions if q])
             questions_section = f"\nQuestions Asked:\n  - {questions_text}"
 
-        texts.append(
-            f"ID: {row_idx}\nTitle: {s['title']}\nDate: {s.get('date', 'Unknown')}\nSummary: {s['summary']}{questions_section}\n"
+        text = s["prompt_text"] = (
+            f"ID: {s['row_idx']}\nTitle: {s['title']}\nDate: {s.get('date', 'Unknown')}\nSummary: {s['summary']}{questions_section}\n"
         )
+    return text
+
+
+def _prepare_user_texts(
+    user_summaries: List[Dict], excluded_indices: Set[int]
+) -> Optional[str]:
+    texts = [
+        _get_summary_text(s)
+        for s in user_summaries
+        if s["row_idx"] not in excluded_indices
+    ]
     if not texts:
         return None
     else:
-        return chr(10).join(texts)
+        return "\n".join(texts)
+
+
+# Instructions shared by every serendipity prompt, dedented once at import
+_PROMPT_HEADER = dedent(
+    """
+    You'll be given two lists of conversations between two users and AI assistants.
+    Your task is to find a serendipitous path between them, linking multiple conversations from each set.
+
+    The connection must include:
+    - **Common nodes**: Conversations with closely matching themes that form a shared foundation.
+    - **Unique nodes**: Complementary branches that diverge into distinct but related areas.
+
+    Focus on the the users' original questions and what they want to achieve.
+    In your outputs, assume the users are expert in the topics they are discussing so avoid any generalizations and be as specific as possible.
+
+    Output in this JSON format:
+    {
+      "path_title": "A short summary title for the serendipitous path, with an emoji at the beginning",
+      "common_indices": [list of integer IDs from both users’ CONVERSATIONS with shared themes],
+      "user1_unique_indices": [list of integer IDs from <USER_1> CONVERSATIONS unique to <USER_1>, absent in <USER_2>],
+      "user2_unique_indices": [list of integer IDs from <USER_2> CONVERSATIONS unique to <USER_2>, absent in <USER_1>],
+      "common_background": "The common ground between <USER_1> and <USER_2> in 2/3 sentences, without mentioning the differences between them.",
+      "user_1_unique_branches": "In Markdown: Bullet points of how <USER_1> uniquely branches off from the common ground",
+      "user_2_unique_branches": "In Markdown: Bullet points of how <USER_2> uniquely branches off from the common ground",
+      "user_1_call_to_action": "In Markdown: Bullet points of what <USER_1> could ask <USER_2> to join the unique branches",
+      "user_2_call_to_action": "In Markdown: Bullet points of what <USER_2> could ask <USER_1> to join the unique branches",
+      "is_sensitive": "Boolean: true if the path involves discussions on topics such as odd curiosities, erotica or other topics that might be embarrassing or delicate to share."
+    }
+
+    IMPORTANT:
+    - common_indices, user1_unique_indices, and user2_unique_indices cannot be empty!
+    - In any texts, replace any references to the users with "<USER_1>" and "<USER_2>".
+    - If you cannot find a serendipitous path, return an empty object: {}
+
+    USER 1 CONVERSATIONS:
+    """
+).lstrip()
 
 
 def generate_serendipity_prompt(
@@ -48,50 +97,23 @@ def generate_serendipity_prompt(
     Returns:
         prompt_text: The generated prompt
     """
+    # Stop as soon as one side has nothing left, without rendering the other
     user1_texts = _prepare_user_texts(user1_summaries, excluded_indices)
-    user2_texts = _prepare_user_texts(user2_summaries, excluded_indices)
+    if not user1_texts:
+        return None
 
-    if not user1_texts or not user2_texts:
+    user2_texts = _prepare_user_texts(user2_summaries, excluded_indices)
+    if not user2_texts:
         return None
-    else:
-        return dedent(
-            f"""
-              You'll be given two lists of conversations between two users and AI assistants.
-              Your task is to find a serendipitous path between them, linking multiple conversations from each set.
-
-              The connection must include:
-              - **Common nodes**: Conversations with closely matching themes that form a shared foundation.
-              - **Unique nodes**: Complementary branches that diverge into distinct but related areas.
-
-              Focus on the the users' original questions and what they want to achieve.
-              In your outputs, assume the users are expert in the topics they are discussing so avoid any generalizations and be as specific as possible.
-
-              Output in this JSON format:
-              {{
-                "path_title": "A short summary title for the serendipitous path, with an emoji at the beginning",
-                "common_indices": [list of integer IDs from both users’ CONVERSATIONS with shared themes],
-                "user1_unique_indices": [list of integer IDs from <USER_1> CONVERSATIONS unique to <USER_1>, absent in <USER_2>],
-                "user2_unique_indices": [list of integer IDs from <USER_2> CONVERSATIONS unique to <USER_2>, absent in <USER_1>],
-                "common_background": "The common ground between <USER_1> and <USER_2> in 2/3 sentences, without mentioning the differences between them.",
-                "user_1_unique_branches": "In Markdown: Bullet points of how <USER_1> uniquely branches off from the common ground",
-                "user_2_unique_branches": "In Markdown: Bullet points of how <USER_2> uniquely branches off from the common ground",
-                "user_1_call_to_action": "In Markdown: Bullet points of what <USER_1> could ask <USER_2> to join the unique branches",
-                "user_2_call_to_action": "In Markdown: Bullet points of what <USER_2> could ask <USER_1> to join the unique branches",
-                "is_sensitive": "Boolean: true if the path involves discussions on topics such as odd curiosities, erotica or other topics that might be embarrassing or delicate to share."
-              }}
-
-              IMPORTANT:
-              - common_indices, user1_unique_indices, and user2_unique_indices cannot be empty!
-              - In any texts, replace any references to the users with "<USER_1>" and "<USER_2>".
-              - If you cannot find a serendipitous path, return an empty object: {{}}
-
-              USER 1 CONVERSATIONS:
-              {_prepare_user_texts(user1_summaries, excluded_indices)}
-
-              USER 2 CONVERSATIONS:
-              {_prepare_user_texts(user2_summaries, excluded_indices)}
-            """.strip()
+
+    return "".join(
+        (
+            _PROMPT_HEADER,
+            user1_texts,
+            "\n\nUSER 2 CONVERSATIONS:\n",
+            user2_texts.rstrip(),
         )
+    )
 
 
 def _join_if_list(value) -> str:
@@ -107,26 +129,26 @@ def parse_serendipity_result(content: str) -> tuple[Optional[Dict], Set[int]]:
     If the JSON is invalid or empty, return an empty dict.
     """
     try:
-        result = repair_json(content, return_objects=True)
+        result = parse_llm_json(content)
 
         if not isinstance(result, dict):
             return None, set()
 
         # LLM might return duplicate indices, so we need to remove them
-        common_indices = np.unique(result["common_indices"]).tolist()
+        common_set = set(map(int, result["common_indices"]))
 
         # Make sure unique indices don't overlap with common indices
-        user1_unique_indices = list(
-            set(np.unique(result["user1_unique_indices"])) - set(common_indices)
-        )
-        user2_unique_indices = list(
-            set(np.unique(result["user2_unique_indices"]))
-            - set(user1_unique_indices)  # Just to be sure
-            - set(common_indices)
-        )
-        indices_to_exclude = (
-            set(common_indices) | set(user1_unique_indices) | set(user2_unique_indices)
+        user1_set = set(map(int, result["user1_unique_indices"])) - common_set
+        user2_set = (
+            set(map(int, result["user2_unique_indices"]))
+            - user1_set  # Just to be sure
+            - common_set
         )
+        indices_to_exclude = common_set | user1_set | user2_set
+
+        common_indices = sorted(common_set)
+        user1_unique_indices = sorted(user1_set)
+        user2_unique_indices = sorted(user2_set)
 
         # If any of these lists are empty, the path doesnt make sense
         if (
@@ -163,100 +185,6 @@ def parse_serendipity_result(content: str) -> tuple[Optional[Dict], Set[int]]:
         return None, set()
 
 
-def format_conversation_summary(row: Dict) -> Dict:
-    """
-    Format a conversation row into a summary dictionary.
-
-    Args:
-        row: A row from the conversation DataFrame
-
-    Returns:
-        A dictionary with conversation details
-    """
-    if not row["summary"]:
-        return None
-
-    date_str = "Unknown"
-    if row["start_date"] and row["start_time"]:
-        # Format time as HH:MM
-        time_obj = row["start_time"]
-        formatted_time = (
-            time_obj.strftime("%H:%M")
-            if hasattr(time_obj, "strftime")
-            else str(time_obj)
-        )
-        date_str = f"{row['start_date']} {formatted_time}"
-
-    return {
-        "conversation_id": row["conversation_id"],
-        "title": row["title"],
-        "summary": row["summary"],
-        "date": date_str,
-        "category": row.get("category", "practical"),
-        "raw_questions": row.get("raw_questions", []),  # Add human questions
-    }
-
-
-def prepare_conversation_summaries(
-    df: pl.DataFrame, parsed_conversations: pl.DataFrame = None
-) -> List[Dict]:
-    """
-    Prepare conversation summaries from a DataFrame.
-
-    Args:
-        df: A polars DataFrame with conversation data
-        parsed_conversations: Optional DataFrame with parsed conversation data including questions
-
-    Returns:
-        A list of conversation summary dictionaries
-    """
-    # Add row indices before sorting
-    df_with_idx = df.with_row_count("row_idx")
-
-    # Sort by date/time for a stable ordering
-    sorted_df = df_with_idx.sort(["start_date", "start_time"])
-
-    # Extract human questions from parsed_conversations if provided
-    raw_questions_by_conv = {}
-    if parsed_conversations is not None:
-        # Create a DataFrame with sorted questions for each conversation_id
-        questions_df = parsed_conversations.select(
-            ["conversation_id", "date", "time", "question"]
-        ).sort(["conversation_id", "date", "time"])
-
-        # Group by conversation_id and collect questions
-        for group in questions_df.group_by("conversation_id"):
-            conv_id = group[0]
-            questions = [row["question"] for row in group[1].iter_rows(named=True)]
-            raw_questions_by_conv[conv_id] = questions
-
-    summaries = []
-    for row in sorted_df.select(
-        [
-            "row_idx",
-            "conversation_id",
-            "title",
-            "summary",
-            "start_date",
-            "start_time",
-            "category",
-        ]
-    ).iter_rows(named=True):
-        # Add human questions to the row data
-        row_data = dict(row)
-        row_data["raw_questions"] = raw_questions_by_conv.get(
-            row["conversation_id"], []
-        )
-
-        summary = format_conversation_summary(row_data)
-        if summary:
-            # Include the row_idx in the summary
-            summary["row_idx"] = row["row_idx"]
-            summaries.append(summary)
-
-    return summaries
-
-
 def get_out_df_schema() -> Dict:
     """Return the complete schema for the result DataFrame."""
 
@@ -296,43 +224,51 @@ def get_out_df_schema() -> Dict:
     }
 
 
+INDEX_TO_ID_COLUMNS = {
+    "common_indices": "common_conversation_ids",
+    "user1_indices": "user1_conversation_ids",
+    "user2_indices": "user2_conversation_ids",
+}
+
+
 def remap_indices_to_conversation_ids(
-    paths_df: pl.DataFrame, clusters_df: pl.DataFrame
-) -> pl.DataFrame:
-    """Remap row indices to conversation IDs, ensuring that the number of new IDs
-    (conversation IDs) matches the number of original indices.
+    paths_lf: pl.LazyFrame, clusters_df: pl.DataFrame
+) -> pl.LazyFrame:
+    """Remap row indices to conversation IDs.
+
+    Indices without a conversation ID are mapped to null, see
+    validate_remapped_indices.
+    """
+    # Map straight from the two columns rather than building a Python dict
+    row_idx = clusters_df["row_idx"]
+    conversation_ids = clusters_df["conversation_id"]
+
+    return paths_lf.with_columns(
+        pl.col(indices_col)
+        .list.eval(
+            pl.element().replace_strict(
+                row_idx, conversation_ids, default=None, return_dtype=pl.Utf8
+            )
+        )
+        .alias(ids_col)
+        for indices_col, ids_col in INDEX_TO_ID_COLUMNS.items()
+    )
+
+
+def validate_remapped_indices(paths_df: pl.DataFrame) -> None:
+    """Ensure that the number of new IDs (conversation IDs) matches the number of
+    original indices.
 
     Raises:
-        ValueError: If any index cannot be mapped to a conversation ID or if the
-        resulting list length does not match the original list length.
+        ValueError: If any index could not be mapped to a conversation ID.
     """
-    idx_to_conv_id = dict(clusters_df.select(["row_idx", "conversation_id"]).rows())
-
-    def remap(indices: pl.Series):
-        # Convert indices to a list for processing
-        original_indices = indices.to_list() if not indices.is_empty() else []
-        # Map each index to a conversation id; if a conversation id is missing, raise an error.
-        mapped = []
-        for idx in original_indices:
-            conv_id = idx_to_conv_id.get(idx)
-            if conv_id is None:
-                raise ValueError(
-                    f"Mapping error: Conversation id for index {idx} is missing."
-                )
-            mapped.append(conv_id)
-        # Verify that the original and mapped lists have the same length.
-        if len(mapped) != len(original_indices):
+    for indices_col, ids_col in INDEX_TO_ID_COLUMNS.items():
+        unmapped = paths_df.filter(
+            pl.col(ids_col).list.drop_nulls().list.len()
+            != pl.col(indices_col).list.len()
+        )
+        if unmapped.height > 0:
             raise ValueError(
-                f"Length mismatch: {len(original_indices)} original indices vs {len(mapped)} mapped conversation IDs."
+                f"Mapping error: Conversation ids for {indices_col} "
+                f"{unmapped[indices_col].to_list()} are missing."
             )
-        return mapped
-
-    return paths_df.with_columns(
-        [
-            pl.col("common_indices")
-            .map_elements(remap)
-            .alias("common_conversation_ids"),
-            pl.col("user1_indices").map_elements(remap).alias("user1_conversation_ids"),
-            pl.col("user2_indices").map_elements(remap).alias("user2_conversation_ids"),
-        ]
-    )
@@ -26,6 +26,9 @@ API_STORAGE_DIRECTORY = STORAGE_BUCKET / "api"
 
 DEPLOYMENT_ROW_LIMIT = {"LOCAL": 50, "BRANCH": None, "PROD": None}[DEPLOYMENT_TYPE]
 
+# Run dimension reduction and HDBSCAN on the GPU (requires RAPIDS cuML)
+USE_CUML = os.getenv("USE_CUML", "") == "1"
+
 DATA_PROVIDERS = [
     "openai",
     "anthropic",
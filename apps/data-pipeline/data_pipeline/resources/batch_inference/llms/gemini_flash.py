@@ -30,6 +30,8 @@ openrouter_config = RemoteLlmConfig(
     inference_url="https://openrouter.ai/api/v1/chat/completions",
     inference_config={
         "model": "google/gemini-2.0-flash-001",
+        # Only used for serendipity paths, which are always parsed as JSON
+        "response_format": {"type": "json_object"},
     },
     context_length=1_000_000,
     concurrency_limit=200,
@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+import polars as pl
+from dagster import build_asset_context
+
+from data_pipeline.assets.ai_conversations.cluster_balance_scores import (
+    cluster_balance_scores,
+)
+from data_pipeline.assets.ai_conversations.utils.balance_scores import (
+    FINITE_INF,
+    calculate_balance_scores,
+)
+
+
+def _normalized(rng, n, d):
+    emb = rng.normal(size=(n, d)).astype(np.float32)
+    return emb / np.linalg.norm(emb, axis=1, keepdims=True)
+
+
+def test_scores_embedding_matrices():
+    rng = np.random.default_rng(0)
+    emb1 = _normalized(rng, 4, 8)
+    emb2 = _normalized(rng, 6, 8)
+
+    score, detailed = calculate_balance_scores(emb1, emb2)
+
+    assert detailed["imbalance"] > 0
+    assert 0 <= detailed["dist"] <= 2
+    assert score == sum(detailed.values())
+
+
+def test_empty_side_is_deprioritized():
+    score, detailed = calculate_balance_scores(
+        np.empty((0, 2), dtype=np.float32), np.array([[1.0, 0.0]], dtype=np.float32)
+    )
+
+    assert score == FINITE_INF
+    assert detailed["dist"] == FINITE_INF
+
+
+def test_cluster_balance_scores_from_list_embeddings():
+    rng = np.random.default_rng(0)
+    cluster_categorizations = pl.DataFrame(
+        {
+            "cluster_id": [0, 0, 0, 0, 1, 1, 1, 1],
+            "user_id": ["u1", "u2", "u2", "u1", "u1", "u2", "u2", "u2"],
+            "embedding": _normalized(rng, 8, 4).tolist(),
+        }
+    )
+
+    result = cluster_balance_scores(
+        build_asset_context(partition_key="u1"), cluster_categorizations
+    )
+    if asyncio.iscoroutine(result):
+        result = asyncio.run(result)
+
+    assert result.height == cluster_categorizations.height
+    assert result["balance_score_scaled"].null_count() == 0
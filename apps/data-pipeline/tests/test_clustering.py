@@ -0,0 +1,155 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from data_pipeline.assets.ai_conversations.utils import clustering
+
+
+class FakeDeviceArray:
+    """Stands in for a cupy array, so host/device transfers can be checked."""
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+
+
+class FakeReducer:
+    def __init__(self, n_components: int, **kwargs):
+        self.n_components = n_components
+
+    def fit_transform(self, X):
+        assert isinstance(X, FakeDeviceArray)
+        return FakeDeviceArray(X.data[:, : self.n_components])
+
+
+class FakePCA(FakeReducer):
+    instances: list = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        FakePCA.instances.append(self)
+
+
+class FakeUMAP(FakeReducer):
+    instances: list = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        FakeUMAP.instances.append(self)
+
+
+class FakeHDBSCAN:
+    def __init__(self, **kwargs):
+        pass
+
+    def fit(self, X):
+        assert isinstance(X, FakeDeviceArray)
+        # Two clusters split on the first coordinate, with points close to the
+        # boundary left as noise
+        first = X.data[:, 0]
+        labels = np.where(first > 0, 1, 0)
+        labels[np.abs(first) < 0.1] = -1
+        self.labels_ = FakeDeviceArray(labels.astype(np.int32))
+        return self
+
+
+def _to_numpy(x):
+    assert isinstance(x, FakeDeviceArray)
+    return x.data
+
+
+@pytest.fixture
+def fake_cuml(monkeypatch):
+    FakePCA.instances = []
+    FakeUMAP.instances = []
+
+    cupy = types.ModuleType("cupy")
+    cupy.asarray = lambda x: FakeDeviceArray(np.asarray(x))
+    cupy.asnumpy = _to_numpy
+
+    cuml = types.ModuleType("cuml")
+    cuml_cluster = types.ModuleType("cuml.cluster")
+    cuml_cluster.HDBSCAN = FakeHDBSCAN
+    cuml_decomposition = types.ModuleType("cuml.decomposition")
+    cuml_decomposition.PCA = FakePCA
+    cuml_manifold = types.ModuleType("cuml.manifold")
+    cuml_manifold.UMAP = FakeUMAP
+
+    for name, module in {
+        "cupy": cupy,
+        "cuml": cuml,
+        "cuml.cluster": cuml_cluster,
+        "cuml.decomposition": cuml_decomposition,
+        "cuml.manifold": cuml_manifold,
+    }.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+    monkeypatch.setattr(clustering, "USE_CUML", True)
+
+    # The CPU implementations must not be reached when the flag is set
+    def fail(*args, **kwargs):
+        raise AssertionError("CPU implementation used with USE_CUML set")
+
+    monkeypatch.setattr(clustering, "PCA", fail)
+    monkeypatch.setattr(clustering.umap, "UMAP", fail)
+    monkeypatch.setattr(clustering.hdbscan, "HDBSCAN", fail)
+
+
+def _embeddings(seed: int, n: int, d: int = 16) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    embeddings = rng.normal(size=(n, d)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("method, used", [("pca", FakePCA), ("umap", FakeUMAP)])
+def test_cuml_routes_dimension_reduction(fake_cuml, method, used):
+    emb1, emb2 = _embeddings(0, 20), _embeddings(1, 30)
+
+    user1_labels, user2_labels = clustering.cluster_embeddings(
+        emb1,
+        emb2,
+        log=lambda _: None,
+        dimension_reduction_method=method,
+        dimension_reduction_n_components=8,
+        clustering_method="hdbscan",
+    )
+
+    other = FakeUMAP if used is FakePCA else FakePCA
+    assert [r.n_components for r in used.instances] == [8]
+    assert other.instances == []
+
+    # Labels come back to the host, one per embedding, with no noise left
+    assert isinstance(user1_labels, np.ndarray)
+    assert isinstance(user2_labels, np.ndarray)
+    assert len(user1_labels) == len(emb1) and len(user2_labels) == len(emb2)
+    assert (np.concatenate([user1_labels, user2_labels]) >= 0).all()
+
+
+def test_cuml_hdbscan_assigns_noise_on_the_host(fake_cuml):
+    embeddings = np.array(
+        [[1.0, 0.0], [0.9, 0.1], [-1.0, 0.0], [-0.9, 0.1], [0.05, 1.0]],
+        dtype=np.float32,
+    )
+
+    labels = clustering.hdbscan_clustering(embeddings)
+
+    assert isinstance(labels, np.ndarray)
+    # The noise point is nearest to the positive cluster's second point
+    assert labels.tolist() == [1, 1, 0, 0, 1]
+
+
+@pytest.mark.parametrize("use_cuml", [False, True])
+def test_unknown_dimension_reduction_method_is_rejected(
+    monkeypatch, fake_cuml, use_cuml
+):
+    monkeypatch.setattr(clustering, "USE_CUML", use_cuml)
+
+    with pytest.raises(ValueError, match="Unknown dimension reduction method"):
+        clustering.cluster_embeddings(
+            _embeddings(0, 10),
+            _embeddings(1, 10),
+            log=lambda _: None,
+            dimension_reduction_method="tsne",
+            clustering_method="hdbscan",
+        )
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from scipy.optimize import linear_sum_assignment
+
+from data_pipeline.assets.ai_conversations.utils.find_top_k_users import (
+    SPARSE_MATCH_MIN_SIZE,
+    get_bipartite_match,
+    sparse_assignment,
+)
+
+
+def _normalized(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _clustered_embeddings(rng, n: int, centers: np.ndarray) -> np.ndarray:
+    labels = rng.integers(0, len(centers), n)
+    return _normalized(centers[labels] + 0.5 * rng.normal(size=(n, centers.shape[1])))
+
+
+@pytest.mark.parametrize(
+    "n1, n2",
+    [
+        (SPARSE_MATCH_MIN_SIZE, SPARSE_MATCH_MIN_SIZE),
+        (SPARSE_MATCH_MIN_SIZE + 100, SPARSE_MATCH_MIN_SIZE + 200),
+        (SPARSE_MATCH_MIN_SIZE + 300, SPARSE_MATCH_MIN_SIZE + 100),
+    ],
+)
+def test_sparse_assignment_is_close_to_exact(n1, n2):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(50, 64))
+    sim = (
+        _clustered_embeddings(rng, n1, centers)
+        @ _clustered_embeddings(rng, n2, centers).T
+    )
+
+    row_ind, col_ind = sparse_assignment(sim)
+    exact_rows, exact_cols = linear_sum_assignment(sim, maximize=True)
+
+    # A valid full matching of the smaller side
+    assert len(row_ind) == len(set(row_ind)) == min(n1, n2)
+    assert len(col_ind) == len(set(col_ind)) == min(n1, n2)
+
+    exact = sim[exact_rows, exact_cols].mean()
+    approx = sim[row_ind, col_ind].mean()
+    assert approx <= exact + 1e-6
+    assert approx == pytest.approx(exact, rel=1e-2)
+
+
+def test_sparse_assignment_falls_back_to_exact_without_full_matching():
+    rng = np.random.default_rng(0)
+    n = SPARSE_MATCH_MIN_SIZE
+    # Every row's nearest neighbors are the same few columns, so the k-NN graph
+    # cannot match all rows
+    rows = _normalized(np.ones((n, 4)) + 1e-3 * rng.normal(size=(n, 4)))
+    cols = np.vstack(
+        [
+            _normalized(np.ones((10, 4))),
+            _normalized(-np.ones((n, 4)) + 0.3 * rng.normal(size=(n, 4))),
+        ]
+    )
+    sim = rows @ cols.T
+
+    row_ind, col_ind = sparse_assignment(sim)
+    exact_rows, exact_cols = linear_sum_assignment(sim, maximize=True)
+
+    assert sim[row_ind, col_ind].sum() == pytest.approx(
+        sim[exact_rows, exact_cols].sum()
+    )
+
+
+def test_get_bipartite_match_above_threshold_is_close_to_exact():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(30, 32))
+    emb1 = _clustered_embeddings(rng, SPARSE_MATCH_MIN_SIZE + 50, centers)
+    emb2 = _clustered_embeddings(rng, SPARSE_MATCH_MIN_SIZE + 80, centers)
+
+    sim = emb1 @ emb2.T
+    exact_rows, exact_cols = linear_sum_assignment(sim, maximize=True)
+
+    assert get_bipartite_match(emb1, emb2) == pytest.approx(
+        sim[exact_rows, exact_cols].mean(), rel=1e-2
+    )
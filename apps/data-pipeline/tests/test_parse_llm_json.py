@@ -0,0 +1,28 @@
+from data_pipeline.assets.ai_conversations.utils.parse_llm_json import parse_llm_json
+
+
+def test_parses_clean_json():
+    assert parse_llm_json('{"a": 1, "b": [1, 2]}') == {"a": 1, "b": [1, 2]}
+    assert parse_llm_json("[1, 2] \n") == [1, 2]
+
+
+def test_unwraps_markdown_fence():
+    content = 'Here you go:\n```json\n{"a": [1, 2]}\n```\nThanks'
+    assert parse_llm_json(content) == {"a": [1, 2]}
+
+
+def test_unwraps_unterminated_markdown_fence():
+    assert parse_llm_json('```json\n{"a": 1}') == {"a": 1}
+
+
+def test_repairs_truncated_json():
+    assert parse_llm_json('{"a": [1, 2') == {"a": [1, 2]}
+
+
+def test_repairs_malformed_json():
+    assert parse_llm_json('{"a": 1,}') == {"a": 1}
+    assert parse_llm_json("{'a': 'b'}") == {"a": "b"}
+
+
+def test_returns_empty_result_for_non_json():
+    assert not parse_llm_json("no json here")
@@ -0,0 +1,51 @@
+import polars as pl
+import pytest
+
+from data_pipeline.assets.ai_conversations.utils.serendipity import (
+    remap_indices_to_conversation_ids,
+    validate_remapped_indices,
+)
+
+
+@pytest.fixture
+def clusters_df() -> pl.DataFrame:
+    return pl.DataFrame(
+        {"row_idx": [0, 1, 2, 3], "conversation_id": ["a", "b", "c", "d"]},
+        schema={"row_idx": pl.UInt32, "conversation_id": pl.Utf8},
+    )
+
+
+def _paths(common, user1, user2) -> pl.LazyFrame:
+    return pl.LazyFrame(
+        {
+            "common_indices": common,
+            "user1_indices": user1,
+            "user2_indices": user2,
+        },
+        schema={
+            "common_indices": pl.List(pl.Int64),
+            "user1_indices": pl.List(pl.Int64),
+            "user2_indices": pl.List(pl.Int64),
+        },
+    )
+
+
+def test_remap_indices_keeps_list_order(clusters_df):
+    paths = _paths([[2, 0], []], [[1], [3, 1]], [[3], [0]])
+
+    result = remap_indices_to_conversation_ids(paths, clusters_df).collect()
+
+    assert result["common_conversation_ids"].to_list() == [["c", "a"], []]
+    assert result["user1_conversation_ids"].to_list() == [["b"], ["d", "b"]]
+    assert result["user2_conversation_ids"].to_list() == [["d"], ["a"]]
+    validate_remapped_indices(result)
+
+
+def test_unmapped_index_is_null_and_fails_validation(clusters_df):
+    paths = _paths([[0]], [[1, 7]], [[2]])
+
+    result = remap_indices_to_conversation_ids(paths, clusters_df).collect()
+
+    assert result["user1_conversation_ids"].to_list() == [["b", None]]
+    with pytest.raises(ValueError, match="user1_indices"):
+        validate_remapped_indices(result)
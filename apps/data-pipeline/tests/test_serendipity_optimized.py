@@ -0,0 +1,95 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from data_pipeline.assets.ai_conversations.serendipity_optimized import (
+    INDEX_COLUMNS,
+    _fix_duplicates,
+)
+
+
+def _fix_duplicates_reference(df: pl.DataFrame) -> pl.DataFrame:
+    """The original row-by-row implementation, keeping the input row order."""
+    seen_by_group: dict = {}
+    new_rows = []
+    for row in df.iter_rows(named=True):
+        seen = seen_by_group.setdefault(row["match_group_id"], set())
+        new_row = row.copy()
+        for col in INDEX_COLUMNS:
+            new_list = []
+            for item in row[col]:
+                if item not in seen:
+                    seen.add(item)
+                    new_list.append(item)
+            new_row[col] = new_list
+        new_rows.append(new_row)
+    return pl.DataFrame(new_rows, schema=df.schema)
+
+
+def _random_paths(seed: int) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    n_rows = 40
+
+    def random_indices():
+        return rng.integers(0, 30, rng.integers(0, 6)).tolist()
+
+    return pl.DataFrame(
+        {
+            "path_title": [f"path {i}" for i in range(n_rows)],
+            "match_group_id": rng.integers(0, 4, n_rows).tolist(),
+            **{col: [random_indices() for _ in range(n_rows)] for col in INDEX_COLUMNS},
+        },
+        schema={
+            "path_title": pl.Utf8,
+            "match_group_id": pl.UInt32,
+            **{col: pl.List(pl.Int64) for col in INDEX_COLUMNS},
+        },
+    )
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_fix_duplicates_matches_row_by_row_implementation(seed):
+    df = _random_paths(seed)
+
+    result = _fix_duplicates(df.lazy()).collect()
+
+    assert result.schema == df.schema
+    assert result.equals(_fix_duplicates_reference(df))
+
+
+def test_fix_duplicates_keeps_first_occurrence_per_match_group():
+    df = pl.DataFrame(
+        {
+            "match_group_id": [0, 0, 1],
+            "common_indices": [[1, 2, 2], [2, 3], [1]],
+            "user1_indices": [[3, 1], [4], [2]],
+            "user2_indices": [[5], [5, 6], []],
+        },
+        schema={
+            "match_group_id": pl.UInt32,
+            **{col: pl.List(pl.Int64) for col in INDEX_COLUMNS},
+        },
+    )
+
+    result = _fix_duplicates(df.lazy()).collect()
+
+    assert result.to_dicts() == [
+        {
+            "match_group_id": 0,
+            "common_indices": [1, 2],
+            "user1_indices": [3],
+            "user2_indices": [5],
+        },
+        {
+            "match_group_id": 0,
+            "common_indices": [],
+            "user1_indices": [4],
+            "user2_indices": [6],
+        },
+        {
+            "match_group_id": 1,
+            "common_indices": [1],
+            "user1_indices": [2],
+            "user2_indices": [],
+        },
+    ]